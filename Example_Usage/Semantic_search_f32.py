@@ -1,58 +1,116 @@
 from usearch.index import Index
 import pandas as pd
+import numpy as np
 from sentence_transformers import SentenceTransformer
+from functools import lru_cache
 import sqlite3
 
-# Load the vector search index with 1024-dimensional vectors using cosine similarity and 32-bit float precision
-index = Index(ndim=1024, metric="cos", dtype="f32")
-index.load(r"./NewsIndex_f32.usearch")
-
-# Database connection setup
+INDEX_PATH = r"./NewsIndex_f32.usearch"
 DB_PATH = r'./CommonCrawlNews.db'
-conn = sqlite3.connect(DB_PATH)
-
-# Load the SentenceTransformer model
-model = SentenceTransformer("mixedbread-ai/deepset-mxbai-embed-de-large-v1")
-
-# Encode the query text with "query: " prompt into an embedding with normalization for better retrieval
-query_embedding = model.encode("query: Pizza", normalize_embeddings=True)
-
-# Perform a search in the index, retrieving up to 10,000 matches
-matches = index.search(query_embedding, 10000)
-
-# Extract distances (cosine distances from query vector) from the search results
-distances = [match.distance for match in matches]
-
-# Extract unique IDs from search results
-ids_f32 = [str(match.key) for match in matches]
-
-# Ensure we have search results before querying the database
-if ids_f32:
-    # Create a DataFrame to store search results
-    search_results = pd.DataFrame({
-        "distance": distances,
-        "ids": ids_f32
-    })
-    
-    # Prepare SQL query to retrieve article details based on retrieved IDs
-    placeholders = ', '.join('?' for _ in ids_f32)  # Create placeholders for parameterized query
-    query = f"""
-    SELECT a.text, a.id, a.date_crawled, a.hostname, a.title
-    FROM Articles a
-    JOIN Article_Vectors av ON a.id = av.article_id
-    WHERE av.hashed_id IN ({placeholders});
-    """
-    
-    # Execute the query with parameterized placeholders to prevent SQL injection
-    db_result = pd.read_sql_query(query, conn, params=ids_f32)
-    
-    # Add cosine distance values to the retrieved articles
-    db_result["cos_dist"] = distances
-else:
-    db_result = pd.DataFrame()  # Return an empty DataFrame if no matches are found
-
-# Close the database connection
-conn.close()
-
-# Display the results
-print(db_result.head())  # Print a preview of results
+MODEL_NAME = "mixedbread-ai/deepset-mxbai-embed-de-large-v1"
+
+
+class NewsSearcher:
+    """Semantic search over the f32 news index that loads the model, index and database only once."""
+
+    def __init__(self, index_path=INDEX_PATH, db_path=DB_PATH, model_name=MODEL_NAME):
+        self.index_path = index_path
+        self.db_path = db_path
+        self.model_name = model_name
+        self._model = None
+        self._index = None
+        self._conn = None
+
+    @property
+    def model(self):
+        # Load the SentenceTransformer model on first use
+        if self._model is None:
+            self._model = SentenceTransformer(self.model_name)
+        return self._model
+
+    @property
+    def index(self):
+        # Memory-map the vector search index with 1024-dimensional vectors using cosine similarity and 32-bit float precision
+        if self._index is None:
+            self._index = Index(ndim=1024, metric="cos", dtype="f32")
+            self._index.view(self.index_path)
+        return self._index
+
+    @property
+    def conn(self):
+        # Database connection setup
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path)
+        return self._conn
+
+    def search(self, queries, k=10000):
+        """Search the index for each query and return the matching articles tagged with their query_id."""
+        # Encode all queries with the "query: " prompt in one batch, normalized for better retrieval
+        query_embeddings = self.model.encode(
+            ["query: " + query for query in queries],
+            batch_size=64,
+            normalize_embeddings=True,
+            convert_to_numpy=True
+        )
+
+        # Pass a C-contiguous float32 (B, 1024) matrix so usearch needs no staging copy
+        query_embeddings = np.ascontiguousarray(query_embeddings, dtype=np.float32)
+
+        # Perform a batched search in the index, retrieving up to k matches per query (threads=0 uses all cores)
+        matches = self.index.search(query_embeddings, k, threads=0)
+
+        # usearch returns a single Matches for a one-row query matrix; indexing BatchMatches trims each row to its count
+        per_query = [matches] if len(queries) == 1 else [matches[i] for i in range(len(queries))]
+
+        # Collect (query_id, rank, key, cosine distance) for every match
+        search_results = [
+            (query_id, rank, int(key), float(dist))
+            for query_id, query_matches in enumerate(per_query)
+            for rank, (key, dist) in enumerate(zip(query_matches.keys, query_matches.distances))
+        ]
+
+        # Ensure we have search results before querying the database
+        if not search_results:
+            return pd.DataFrame()  # Return an empty DataFrame if no matches are found
+
+        # Load the ranked search results into a temporary table so SQLite can join against it
+        with self.conn:
+            self.conn.execute("DROP TABLE IF EXISTS temp.search_results")
+            self.conn.execute(
+                "CREATE TEMP TABLE search_results "
+                "(query_id INTEGER, rank INTEGER, hashed_id INTEGER, distance REAL, PRIMARY KEY (query_id, rank))"
+            )
+            self.conn.executemany("INSERT INTO search_results VALUES (?, ?, ?, ?)", search_results)
+
+        # Retrieve article details with their cosine distance, in search rank order per query
+        query = """
+        SELECT r.query_id, a.text, a.id, a.date_crawled, a.hostname, a.title, r.distance AS cos_dist
+        FROM search_results r
+        JOIN Article_Vectors av ON av.hashed_id = r.hashed_id
+        JOIN Articles a ON a.id = av.id
+        ORDER BY r.query_id, r.rank;
+        """
+        return pd.read_sql_query(query, self.conn)
+
+    def close(self):
+        """Close the database connection."""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+@lru_cache(maxsize=1)
+def get_searcher(index_path=INDEX_PATH, db_path=DB_PATH, model_name=MODEL_NAME):
+    """Return a shared NewsSearcher so repeated searches reuse the loaded model and index."""
+    return NewsSearcher(index_path, db_path, model_name)
+
+
+if __name__ == "__main__":
+    searcher = get_searcher()
+    db_result = searcher.search(["Pizza"])
+
+    # Close the database connection
+    searcher.close()
+
+    # Display the results
+    print(db_result.head())  # Print a preview of results
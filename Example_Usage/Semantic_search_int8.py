@@ -1,66 +1,126 @@
 from usearch.index import Index
 import pandas as pd
 from sentence_transformers import SentenceTransformer, quantize_embeddings
+from functools import lru_cache
 import sqlite3
 import numpy as np
 
-# Load the integer 8-bit vector search index with 1024-dimensional vectors using inner product distance
-indexint8 = Index(ndim=1024, metric="ip", dtype="i8")
-indexint8.load(r"./NewsIndex_int8.usearch")
+INDEX_PATH = r"./NewsIndex_int8.usearch"
+CALIBRATION_PATH = r"./calibration_ranges.npy"
+DB_PATH = r'./CommonCrawlNews.db'
+MODEL_NAME = "mixedbread-ai/deepset-mxbai-embed-de-large-v1"
 
-#Load calibration embeddings
-calibration_embeddings=np.load(r"./calibration_embeddings.npy")
 
-# Database connection setup
-DB_PATH = r'./CommonCrawlNews.db'
-conn = sqlite3.connect(DB_PATH)
-
-# Load the SentenceTransformer model
-model = SentenceTransformer("mixedbread-ai/deepset-mxbai-embed-de-large-v1")
-
-# Encode the query text into an embedding with normalization for better retrieval
-query_embedding = model.encode("query: Pizza", normalize_embeddings=True)
-
-# Quantize query_embedding into int8 precision
-query = quantize_embeddings(query_embedding, precision="int8",ranges=calibration_ranges)
-
-# Perform a search in the int8 index, retrieving up to 10,000 matches
-matches = indexint8.search(query, 10000)
-
-# Extract distances (Inner Product distances from query vector) from the search results
-distances = [match.distance for match in matches]
-
-# Extract unique IDs from search results
-ids_int8 = [str(match.key) for match in matches]
-
-# Ensure we have search results before querying the database
-if ids_int8:
-    # Create a DataFrame to store search results
-    search_results = pd.DataFrame({
-        "distance": distances,
-        "ids": ids_int8
-    })
-    
-    # Prepare SQL query to retrieve article details based on retrieved IDs
-    placeholders = ', '.join('?' for _ in ids_int8)  # Create placeholders for parameterized query
-    query = f"""
-    SELECT a.text, a.id, a.date_crawled, a.hostname, a.title
-    FROM Articles a
-    JOIN Article_Vectors av ON a.id = av.article_id
-    WHERE av.hashed_id IN ({placeholders});
-    """
-    
-    # Execute the query with parameterized placeholders to prevent SQL injection
-    db_result = pd.read_sql_query(query, conn, params=ids_int8)
-    
-    # Add Inner Product distance values to the retrieved articles
-    db_result["ip_dist"] = distances
-else:
-    db_result = pd.DataFrame()  # Return an empty DataFrame if no matches are found
-
-# Close the database connection
-conn.close()
-
-# Display the results
-print(db_result.head())  # Print a preview of results
+class NewsSearcher:
+    """Semantic search over the int8 news index that loads the model, index and database only once."""
+
+    def __init__(self, index_path=INDEX_PATH, db_path=DB_PATH, model_name=MODEL_NAME, calibration_path=CALIBRATION_PATH):
+        self.index_path = index_path
+        self.db_path = db_path
+        self.model_name = model_name
+        self.calibration_path = calibration_path
+        self._model = None
+        self._index = None
+        self._calibration_ranges = None
+        self._conn = None
+
+    @property
+    def model(self):
+        # Load the SentenceTransformer model on first use
+        if self._model is None:
+            self._model = SentenceTransformer(self.model_name)
+        return self._model
+
+    @property
+    def index(self):
+        # Memory-map the integer 8-bit vector search index with 1024-dimensional vectors using inner product distance
+        if self._index is None:
+            self._index = Index(ndim=1024, metric="ip", dtype="i8")
+            self._index.view(self.index_path)
+        return self._index
+
+    @property
+    def calibration_ranges(self):
+        # Load the calibration ranges used to quantize the stored embeddings
+        if self._calibration_ranges is None:
+            self._calibration_ranges = np.load(self.calibration_path)
+        return self._calibration_ranges
+
+    @property
+    def conn(self):
+        # Database connection setup
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path)
+        return self._conn
+
+    def search(self, queries, k=10000):
+        """Search the index for each query and return the matching articles tagged with their query_id."""
+        # Encode all queries with the "query: " prompt in one batch, normalized for better retrieval
+        query_embeddings = self.model.encode(
+            ["query: " + query for query in queries],
+            batch_size=64,
+            normalize_embeddings=True,
+            convert_to_numpy=True
+        )
+
+        # Quantize query embeddings into int8 precision
+        query_embeddings = quantize_embeddings(query_embeddings, precision="int8", ranges=self.calibration_ranges)
+
+        # Perform a batched search in the int8 index, retrieving up to k matches per query (threads=0 uses all cores)
+        matches = self.index.search(query_embeddings, k, threads=0)
+
+        # usearch returns a single Matches for a one-row query matrix; indexing BatchMatches trims each row to its count
+        per_query = [matches] if len(queries) == 1 else [matches[i] for i in range(len(queries))]
+
+        # Collect (query_id, rank, key, Inner Product distance) for every match
+        search_results = [
+            (query_id, rank, int(key), float(dist))
+            for query_id, query_matches in enumerate(per_query)
+            for rank, (key, dist) in enumerate(zip(query_matches.keys, query_matches.distances))
+        ]
+
+        # Ensure we have search results before querying the database
+        if not search_results:
+            return pd.DataFrame()  # Return an empty DataFrame if no matches are found
+
+        # Load the ranked search results into a temporary table so SQLite can join against it
+        with self.conn:
+            self.conn.execute("DROP TABLE IF EXISTS temp.search_results")
+            self.conn.execute(
+                "CREATE TEMP TABLE search_results "
+                "(query_id INTEGER, rank INTEGER, hashed_id INTEGER, distance REAL, PRIMARY KEY (query_id, rank))"
+            )
+            self.conn.executemany("INSERT INTO search_results VALUES (?, ?, ?, ?)", search_results)
+
+        # Retrieve article details with their Inner Product distance, in search rank order per query
+        query = """
+        SELECT r.query_id, a.text, a.id, a.date_crawled, a.hostname, a.title, r.distance AS ip_dist
+        FROM search_results r
+        JOIN Article_Vectors av ON av.hashed_id = r.hashed_id
+        JOIN Articles a ON a.id = av.id
+        ORDER BY r.query_id, r.rank;
+        """
+        return pd.read_sql_query(query, self.conn)
+
+    def close(self):
+        """Close the database connection."""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+@lru_cache(maxsize=1)
+def get_searcher(index_path=INDEX_PATH, db_path=DB_PATH, model_name=MODEL_NAME, calibration_path=CALIBRATION_PATH):
+    """Return a shared NewsSearcher so repeated searches reuse the loaded model and index."""
+    return NewsSearcher(index_path, db_path, model_name, calibration_path)
+
+
+if __name__ == "__main__":
+    searcher = get_searcher()
+    db_result = searcher.search(["Pizza"])
+
+    # Close the database connection
+    searcher.close()
 
+    # Display the results
+    print(db_result.head())  # Print a preview of results
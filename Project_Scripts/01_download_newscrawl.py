@@ -4,15 +4,16 @@ Script for downloading CommonCrawl News WARC files for a specified month.
 
 Updated for better maintainability and robustness.
 """
-import requests
-from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import httpx
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential, before_sleep_log
 import gzip
 import os
+import subprocess
 import logging
-import time
 from warcio.archiveiterator import ArchiveIterator
 import argparse
-from tqdm import tqdm
+from tqdm.asyncio import tqdm
 from urllib.error import HTTPError
 
 # Configure logging
@@ -29,6 +30,11 @@ parser.add_argument(
     type=str,
     help='The Year and Month in YYYY/MM format (e.g., 2023/09).'
 )
+parser.add_argument(
+    '--aria2c',
+    action='store_true',
+    help='Download WARC files with aria2c instead of the built-in downloader.'
+)
 args = parser.parse_args()
 YEAR_MONTH = args.year_month
 
@@ -42,35 +48,59 @@ folder = YEAR_MONTH.replace("/", "-")
 WARC_PATHS_FILE = f"{YEAR_MONTH}/warc.paths.gz"
 DOWNLOAD_FOLDER = os.path.join(r"D:\CommonCrawl\news", folder)
 DOWNLOAD_URL = "https://data.commoncrawl.org/"
+CHUNK_SIZE = 1 << 20  # 1 MiB
+MAX_CONNECTIONS = 64
 
 # Ensure folder exists
 os.makedirs(DOWNLOAD_FOLDER, exist_ok=True)
 
+def create_client():
+    """Create an HTTP/2 client shared by all concurrent downloads."""
+    return httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(max_connections=MAX_CONNECTIONS),
+        # Waiting for a free connection is not an error; concurrency is bounded by the callers
+        timeout=httpx.Timeout(60.0, pool=None)
+    )
+
 # Retry logic for requests
-def download_with_retries(url, local_path, retries=5, backoff=10):
-    """Download a file with retries and exponential backoff."""
-    wait_time = backoff
-    for attempt in range(retries):
-        try:
-            logging.info(f"Attempting to download: {url}")
-            with requests.get(url, stream=True) as response:
-                response.raise_for_status()
-                with open(local_path, 'wb') as fd:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        fd.write(chunk)
-            logging.info(f"Downloaded: {local_path}")
-            return True
-        except requests.exceptions.RequestException as e:
-            logging.warning(f"Error downloading {url}: {e}. Retrying in {wait_time} seconds...")
-            time.sleep(wait_time)
-            wait_time *= 2
-    logging.error(f"Failed to download {url} after {retries} attempts.")
-    return False
+@retry(
+    retry=retry_if_exception_type(httpx.HTTPError),
+    stop=stop_after_attempt(5),
+    wait=wait_exponential(multiplier=10),
+    before_sleep=before_sleep_log(logging.getLogger(), logging.WARNING),
+    reraise=True
+)
+async def download(url, local_path, client):
+    """Stream a file to disk in 1 MiB chunks, retrying with exponential backoff."""
+    logging.info(f"Attempting to download: {url}")
+    partial_path = local_path + ".part"
+    async with client.stream("GET", url) as response:
+        response.raise_for_status()
+        with open(partial_path, 'wb') as fd:
+            async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                fd.write(chunk)
+    os.replace(partial_path, local_path)
+    logging.info(f"Downloaded: {local_path}")
+
+async def download_with_retries(url, local_path, client):
+    """Download a file and report whether it succeeded after all retries."""
+    try:
+        await download(url, local_path, client)
+        return True
+    except httpx.HTTPError as e:
+        logging.error(f"Failed to download {url}: {e}")
+        return False
+
+async def download_paths_file(url, local_path):
+    """Download the warc.paths.gz listing."""
+    async with create_client() as client:
+        return await download_with_retries(url, local_path, client)
 
 # Download warc.paths.gz
 warc_paths_local = os.path.join(DOWNLOAD_FOLDER, os.path.basename(WARC_PATHS_FILE))
 if not os.path.exists(warc_paths_local):
-    if not download_with_retries(BASE_URL + WARC_PATHS_FILE, warc_paths_local):
+    if not asyncio.run(download_paths_file(BASE_URL + WARC_PATHS_FILE, warc_paths_local)):
         logging.error("Failed to download warc.paths.gz. Exiting.")
         exit(1)
 
@@ -80,19 +110,55 @@ with gzip.open(warc_paths_local, 'rt') as f:
     file_paths = [line.strip() for line in f]
 
 # Function to download a single WARC file
-def download_warc_file(path):
-    """Download a single WARC file."""
+async def download_warc_file(path, client, semaphore):
+    """Download a single WARC file once a download slot is free."""
     url = DOWNLOAD_URL + path
     local_filename = os.path.join(DOWNLOAD_FOLDER, os.path.basename(path))
     if os.path.exists(local_filename):
         logging.info(f"File already exists, skipping: {local_filename}")
         return
-    download_with_retries(url, local_filename)
+    async with semaphore:
+        await download_with_retries(url, local_filename, client)
+
+async def download_warc_files(paths):
+    """Download all WARC files over one connection pool, at most MAX_CONNECTIONS at a time."""
+    semaphore = asyncio.Semaphore(MAX_CONNECTIONS)
+    async with create_client() as client:
+        await tqdm.gather(
+            *[download_warc_file(path, client, semaphore) for path in paths], desc="Downloading WARC files"
+        )
+
+def download_with_aria2c(paths):
+    """Download WARC files with aria2c, which handles concurrency, retries and resume."""
+    # Skip finished files; an .aria2 control file marks a partial download that aria2c resumes
+    local_paths = {path: os.path.join(DOWNLOAD_FOLDER, os.path.basename(path)) for path in paths}
+    pending = [
+        path for path, local in local_paths.items()
+        if not os.path.exists(local) or os.path.exists(local + ".aria2")
+    ]
+    urls_file = os.path.join(DOWNLOAD_FOLDER, "urls.txt")
+    with open(urls_file, 'w') as f:
+        f.writelines(DOWNLOAD_URL + path + "\n" for path in pending)
+    try:
+        subprocess.run([
+            'aria2c', f'--input-file={urls_file}', '-d', DOWNLOAD_FOLDER,
+            '-x', '8', '-j', '16', '--continue=true', '--retry-wait=10', '--max-tries=5',
+            '--file-allocation=falloc'
+        ], check=True)
+    except FileNotFoundError:
+        logging.error("aria2c not found. Install it or run without --aria2c.")
+        exit(1)
+    except subprocess.CalledProcessError as e:
+        logging.error(f"aria2c failed to download some files (exit code {e.returncode}).")
+    finally:
+        os.remove(urls_file)
 
 # Download WARC files concurrently
 logging.info(f"Starting download of {len(file_paths)} WARC files.")
-with ThreadPoolExecutor(max_workers=10) as executor:
-    list(tqdm(executor.map(download_warc_file, file_paths), total=len(file_paths), desc="Downloading WARC files"))
+if args.aria2c:
+    download_with_aria2c(file_paths)
+else:
+    asyncio.run(download_warc_files(file_paths))
 
 # Cleanup temporary files
 logging.info("Download process complete. Cleaning up temporary files.")
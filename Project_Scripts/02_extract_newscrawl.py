@@ -1,8 +1,9 @@
-import gzip
 import os
 import logging
 from warcio.archiveiterator import ArchiveIterator
-import pandas as pd
+from isal import igzip
+from contextlib import contextmanager
+import pyarrow as pa
 from os import listdir
 from multiprocessing import Pool
 from tqdm import tqdm
@@ -15,11 +16,42 @@ logging.basicConfig(
     handlers=[logging.StreamHandler()]
 )
 
-def extract_records(warc_file_path):
-    """Extract records from a WARC file."""
-    records = []
+# Number of records buffered before a record batch is written
+BATCH_SIZE = 1024
+READ_BUFFER_SIZE = 1 << 20
+
+SCHEMA = pa.schema([
+    ("ID", pa.string()),
+    ("URL", pa.string()),
+    ("Date", pa.string()),
+    ("Content-Length", pa.int64()),
+    ("MIME-Type", pa.string()),
+    ("Content", pa.large_binary())
+])
+
+def write_batch(writer, columns):
+    """Write the buffered columns as one record batch and clear the buffers."""
+    if columns[0]:
+        writer.write_batch(pa.record_batch(columns, schema=SCHEMA))
+        for column in columns:
+            column.clear()
+
+@contextmanager
+def open_warc(warc_file_path):
+    """Open a gzipped WARC file for sequential reading with ISA-L decompression."""
+    with open(warc_file_path, 'rb', buffering=READ_BUFFER_SIZE) as raw:
+        # Hint the kernel to read ahead aggressively (not available on Windows)
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(raw.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        with igzip.open(raw, 'rb') as stream:
+            yield stream
+
+def extract_records(warc_file_path, writer):
+    """Extract records from a WARC file and stream them to an Arrow IPC writer."""
+    columns = [[] for _ in SCHEMA]
+    count = 0
     try:
-        with gzip.open(warc_file_path, 'rb') as stream:
+        with open_warc(warc_file_path) as stream:
             iterator = ArchiveIterator(stream)
             for record in tqdm(iterator, desc=f"Extracting {os.path.basename(warc_file_path)}", leave=False):
                 if record.rec_type == 'response':
@@ -30,35 +62,40 @@ def extract_records(warc_file_path):
                         content_length = record.rec_headers.get_header('Content-Length')
                         mime_type = record.http_headers.get_header('Content-Type') if record.http_headers else None
                         content = record.content_stream().read()
-                        records.append((warc_record_id, url, date, content_length, mime_type, content))
+                        values = (warc_record_id, url, date, int(content_length) if content_length else None, mime_type, content)
                     except Exception as e:
                         logging.warning(f"Error processing record in {warc_file_path}: {e}")
+                        continue
+                    for column, value in zip(columns, values):
+                        column.append(value)
+                    count += 1
+                    if len(columns[0]) >= BATCH_SIZE:
+                        write_batch(writer, columns)
     except Exception as e:
         logging.error(f"Error extracting records from {warc_file_path}: {e}")
-    
-    return records
+
+    write_batch(writer, columns)
+    return count
 
 def process_warc_file(warc_file_path):
     """Process a single WARC file."""
     try:
         logging.info(f"Processing file: {warc_file_path}")
         
-        # Extract records
-        data = extract_records(warc_file_path)
+        # Stream records into a zstd-compressed Feather (Arrow IPC) file
+        output_path = warc_file_path.replace(".warc.gz", ".feather")
+        options = pa.ipc.IpcWriteOptions(compression=pa.Codec("zstd", compression_level=3))
+        with pa.ipc.new_file(output_path, SCHEMA, options=options) as writer:
+            count = extract_records(warc_file_path, writer)
         
-        if data:
-            # Convert to DataFrame
-            df = pd.DataFrame(data, columns=["ID", "URL", "Date", "Content-Length", "MIME-Type", "Content"])
-            
-            # Save DataFrame as Feather file
-            output_path = warc_file_path.replace(".warc.gz", ".feather")
-            df.to_feather(output_path)
+        if count:
             logging.info(f"Saved Feather file: {output_path}")
             
             # Delete WARC file after successful processing
             os.remove(warc_file_path)
             logging.info(f"Deleted WARC file: {warc_file_path}")
         else:
+            os.remove(output_path)
             logging.warning(f"No records extracted from {warc_file_path}")
         
     except Exception as e:
@@ -10,8 +10,7 @@ import multiprocessing
 import os
 import logging
 import trafilatura
-import json
-from urllib.parse import urlparse
+import xxhash
 from argparse import ArgumentParser
 
 # Configure logging
@@ -21,58 +20,76 @@ logging.basicConfig(
     handlers=[logging.StreamHandler()]
 )
 
-def extract_top_level_domain(url):
-    """Extract the top-level domain (TLD) from a URL."""
+# TLDs to exclude, set once per worker process by init_worker
+exclude_tlds = frozenset()
+
+def init_worker(tlds):
+    """Store the excluded TLDs in the worker process."""
+    global exclude_tlds
+    exclude_tlds = tlds
+
+def extract_top_level_domains(urls):
+    """Extract the top-level domain (TLD) from a Series of URLs."""
+    hostnames = urls.astype("string[pyarrow]").str.extract(r"://(?:[^/?#@]*@)?([^/?#:]*)", expand=False).str.lower()
+    tlds = "." + hostnames.str.rsplit(".", n=1).str[-1]
+    return tlds.where(hostnames.str.contains(".", regex=False), hostnames)
+
+def extract_content(content, record_id, url):
+    """Extract main text and metadata from a single HTML record as an output row."""
     try:
-        parsed_url = urlparse(url)
-        domain_parts = parsed_url.netloc.split('.')
-        if len(domain_parts) > 1:
-            return '.' + domain_parts[-1]
-        return domain_parts[0]
+        # output_format="json" keeps raw_text identical to the "raw_text" field of trafilatura's JSON output
+        document = trafilatura.bare_extraction(
+            content,
+            include_comments=False,
+            deduplicate=True,
+            output_format="json",
+            with_metadata=True,
+            target_language="de"
+        )
     except Exception as e:
-        logging.warning(f"Error extracting TLD from {url}: {e}")
+        logging.warning(f"Error processing record {url}: {e}")
         return None
+    if document is None:
+        return None
+    return {
+        "id": record_id,
+        "text": document.raw_text,
+        "url": url,
+        "excerpt": document.description,
+        "date": document.date,
+        "tags": ";".join(document.tags or []),
+        "categories": ";".join(document.categories or []),
+        "title": document.title,
+        "date_crawled": document.filedate,
+        "hostname": document.hostname
+    }
 
-def parse_file(filename, exclude_tlds):
+def parse_file(filename):
     """Parse a single feather file and extract text using Trafilatura."""
     rows = []
     try:
-        data = pd.read_feather(filename)
-        data["TLD"] = data["URL"].apply(extract_top_level_domain)
-        data = data[~data["TLD"].isin(exclude_tlds["Country Code"])]
+        data = pd.read_feather(filename, columns=["ID", "URL", "Content"])
+        data["TLD"] = extract_top_level_domains(data["URL"])
+        data = data[~data["TLD"].map(exclude_tlds.__contains__)]
         data = data.reset_index(drop=True)
 
-        for _, row in tqdm(data.iterrows(), total=len(data), desc=f"Processing {os.path.basename(filename)}", leave=False):
-            try:
-                extracted = trafilatura.extract(
-                    row["Content"],
-                    include_comments=False,
-                    deduplicate=True,
-                    output_format="json",
-                    with_metadata=True,
-                    target_language="de"
-                )
-                if extracted:
-                    root = json.loads(extracted)
-                    rows.append({
-                        "id": row["ID"],
-                        "text": root.get("raw_text"),
-                        "url": row["URL"],
-                        "excerpt": root.get("excerpt"),
-                        "date": root.get("date"),
-                        "tags": root.get("tags"),
-                        "categories": root.get("categories"),
-                        "title": root.get("title"),
-                        "date_crawled": root.get("filedate"),
-                        "hostname": root.get("hostname")
-                    })
-            except Exception as e:
-                logging.warning(f"Error processing record {row['URL']}: {e}")
+        records = zip(data["Content"].tolist(), data["ID"].tolist(), data["URL"].tolist())
+
+        # Drop empty texts and duplicates per hostname as rows are extracted
+        seen = set()
+        for content, record_id, url in tqdm(records, total=len(data), desc=f"Processing {os.path.basename(filename)}", leave=False):
+            row = extract_content(content, record_id, url)
+            if not row or not row["text"]:
+                continue
+            key = xxhash.xxh3_64_intdigest(f"{row['text']}\x00{row['hostname'] or ''}".encode())
+            if key not in seen:
+                seen.add(key)
+                rows.append(row)
 
         if rows:
-            output_df = pd.DataFrame(rows).dropna(subset=["text"]).drop_duplicates(subset=["text", "hostname"])
+            output_df = pd.DataFrame(rows)
             output_file = filename.replace(".feather", "_processed.feather")
-            output_df.to_feather(output_file)
+            output_df.to_feather(output_file, compression="zstd", compression_level=3)
             logging.info(f"Saved processed file: {output_file}")
 
     except Exception as e:
@@ -84,7 +101,7 @@ def main(folder, tlds_file):
         logging.error(f"Folder does not exist: {folder}")
         return
 
-    exclude_tlds = pd.read_excel(tlds_file)
+    tlds = frozenset(pd.read_excel(tlds_file)["Country Code"].astype(str).str.lower())
     files = [os.path.join(folder, f) for f in os.listdir(folder) if f.endswith(".feather")]
 
     if not files:
@@ -92,9 +109,10 @@ def main(folder, tlds_file):
         return
 
     logging.info(f"Processing {len(files)} files from folder: {folder}")
-    with multiprocessing.Pool(processes=os.cpu_count()) as pool:
+    # Extraction is mostly Python-level regex and lxml callbacks that hold the GIL, so keep one process per core
+    with multiprocessing.Pool(processes=os.cpu_count(), initializer=init_worker, initargs=(tlds,)) as pool:
         with tqdm(total=len(files), desc="Overall Progress") as pbar:
-            for _ in pool.imap_unordered(lambda f: parse_file(f, exclude_tlds), files):
+            for _ in pool.imap_unordered(parse_file, files):
                 pbar.update()
 
 if __name__ == "__main__":
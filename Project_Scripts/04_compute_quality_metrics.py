@@ -5,14 +5,18 @@ Script for computing quality metrics for news articles.
 Updated for maintainability, efficiency, and robustness.
 """
 import os
-import re
 import logging
+import numba
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+from pyarrow import feather
 from functools import partial
 from multiprocessing import Pool, cpu_count
 from tqdm import tqdm
 from glob import glob
 import argparse
+from quality_criteria import quality_condition
 
 # Configure logging
 logging.basicConfig(
@@ -21,65 +25,201 @@ logging.basicConfig(
     handlers=[logging.StreamHandler()]
 )
 
-# Pre-compile regular expressions
-sentence_pattern = re.compile(r'\b[^.!?]+[.!?]*')
+# Metric names in the order the kernel returns them
+METRIC_NAMES = (
+    "fraction_ellipsis",
+    "fraction_non_alpha_words",
+    "mean_word_length",
+    "javascript_count",
+    "words_per_line",
+    "bullet_point_starts",
+    "sentences_count",
+    "word_count",
+)
+COUNT_METRICS = ("javascript_count", "bullet_point_starts", "sentences_count", "word_count")
+
+# Character classes for the UTF-8 scan
+ALPHA, WORD, SPACE, TERMINATOR = 1, 2, 4, 8
+MAX_CODEPOINT = 0x110000
+
+def build_codepoint_classes():
+    """Build a lookup table of character classes for every Unicode code point.
+
+    The classes follow Python's own definitions so the kernel matches the str-based metrics:
+    ALPHA is str.isalpha, SPACE is str.isspace (the separators of str.split) and WORD is the
+    regex \\w (str.isalnum or "_").
+    """
+    chars = "".join(map(chr, range(MAX_CODEPOINT)))
+    classes = np.zeros(MAX_CODEPOINT, dtype=np.uint8)
+    classes[np.fromiter(map(str.isalpha, chars), dtype=np.bool_, count=MAX_CODEPOINT)] |= ALPHA | WORD
+    classes[np.fromiter(map(str.isalnum, chars), dtype=np.bool_, count=MAX_CODEPOINT)] |= WORD
+    classes[np.fromiter(map(str.isspace, chars), dtype=np.bool_, count=MAX_CODEPOINT)] |= SPACE
+    classes[ord("_")] |= WORD
+    for c in ".!?":
+        classes[ord(c)] |= TERMINATOR
+    return classes
+
+CODEPOINT_CLASSES = build_codepoint_classes()
+BULLET_POINTS = np.array([0x2022, 0x2023, 0x25B6, 0x25C0, 0x25E6, 0x25A0, 0x25A1, 0x25AA, 0x25AB, 0x2013], dtype=np.int64)
+JAVASCRIPT = np.frombuffer(b"javascript", dtype=np.uint8)
+
+@numba.njit(cache=True, boundscheck=False)
+def ends_with_ellipsis(buf, end):
+    """Check whether the bytes before `end` are "..." or "\u2026"."""
+    if end < 3:
+        return 0
+    dots = (buf[end - 1] == 0x2E) & (buf[end - 2] == 0x2E) & (buf[end - 3] == 0x2E)
+    ellipsis = (buf[end - 3] == 0xE2) & (buf[end - 2] == 0x80) & (buf[end - 1] == 0xA6)
+    return int(dots | ellipsis)
+
+@numba.njit(cache=True, boundscheck=False)
+def article_metrics(buf, codepoint_classes, bullet_points, javascript):
+    """Compute quality metrics in a single pass over the UTF-8 bytes of an article."""
+    n = buf.shape[0]
+    lines, ellipsis_lines, bullet_lines = 1, 0, 0
+    total_words, non_alpha_words, total_word_length = 0, 0, 0
+    sentences, javascript_count = 0, 0
+    in_word, word_has_alpha = False, False
+    segment_has_word = 0
+
+    i = 0
+    while i < n:
+        # Decode one code point
+        b = buf[i]
+        if b < 0x80:
+            cp, width = np.int64(b), 1
+        elif b < 0xE0:
+            cp, width = ((b & 0x1F) << 6) | (buf[i + 1] & 0x3F), 2
+        elif b < 0xF0:
+            cp, width = ((b & 0x0F) << 12) | ((buf[i + 1] & 0x3F) << 6) | (buf[i + 2] & 0x3F), 3
+        else:
+            cp = ((b & 0x07) << 18) | ((buf[i + 1] & 0x3F) << 12) | ((buf[i + 2] & 0x3F) << 6) | (buf[i + 3] & 0x3F)
+            width = 4
+        cls = codepoint_classes[cp]
+
+        # Line bookkeeping
+        if b == 0x0A:
+            ellipsis_lines += ends_with_ellipsis(buf, i)
+            lines += 1
+        elif width == 3 and (i == 0 or buf[i - 1] == 0x0A):
+            for bullet in bullet_points:
+                if cp == bullet:
+                    bullet_lines += 1
+                    break
+
+        # Words, split on the same whitespace as str.split
+        if cls & SPACE:
+            if in_word:
+                total_words += 1
+                non_alpha_words += not word_has_alpha
+                in_word = False
+        else:
+            if not in_word:
+                in_word = True
+                word_has_alpha = False
+            word_has_alpha |= (cls & ALPHA) != 0
+            total_word_length += 1
+
+        # Sentences: runs of text containing a word character, closed by ".!?" (branchless)
+        is_terminator = (cls & TERMINATOR) >> 3
+        is_word = (cls & WORD) >> 1
+        sentences += segment_has_word & is_terminator
+        segment_has_word = (segment_has_word | is_word) & (1 - is_terminator)
+
+        # Case-insensitive "javascript"
+        if (b | 0x20) == 0x6A and i + 10 <= n:
+            match = True
+            for k in range(1, 10):
+                if (buf[i + k] | 0x20) != javascript[k]:
+                    match = False
+                    break
+            javascript_count += match
+
+        i += width
+
+    if in_word:
+        total_words += 1
+        non_alpha_words += not word_has_alpha
+    ellipsis_lines += ends_with_ellipsis(buf, n)
+    sentences += segment_has_word
+
+    out = np.zeros(8, dtype=np.float64)
+    out[0] = ellipsis_lines / lines
+    out[1] = non_alpha_words / total_words if total_words else 0.0
+    out[2] = total_word_length / total_words if total_words else 0.0
+    out[3] = javascript_count
+    out[4] = total_words / lines
+    out[5] = bullet_lines
+    out[6] = sentences
+    out[7] = total_words
+    return out
 
 def compute_metrics(article):
     """Compute quality metrics for a single article."""
-    bullet_points = {"\u2022", "\u2023", "\u25B6", "\u25C0", "\u25E6", "\u25A0", "\u25A1", "\u25AA", "\u25AB", "\u2013"}
-    metrics = {
-        "fraction_ellipsis": 0,
-        "fraction_non_alpha_words": 0,
-        "mean_word_length": 0,
-        "javascript_count": article.lower().count("javascript"),
-        "words_per_line": 0,
-        "bullet_point_starts": 0,
-        "sentences_count": len(sentence_pattern.findall(article)),
-        "word_count": 0
-    }
-
-    total_word_length, non_alpha_word_count, total_words, ellipsis_count = 0, 0, 0, 0
-    lines = article.split('\n')
-    for line in lines:
-        line_ended_with_ellipsis = line.endswith("...") or line.endswith("…")
-        ellipsis_count += line_ended_with_ellipsis
-
-        words = line.split()
-        for word in words:
-            non_alpha_word_count += not any(c.isalpha() for c in word)
-            total_word_length += len(word)
-
-        total_words += len(words)
-        metrics["bullet_point_starts"] += int(line != "" and line[0] in bullet_points)
-
-    metrics["fraction_ellipsis"] = ellipsis_count / len(lines) if lines else 0
-    metrics["fraction_non_alpha_words"] = non_alpha_word_count / total_words if total_words else 0
-    metrics["mean_word_length"] = total_word_length / total_words if total_words else 0
-    metrics["words_per_line"] = total_words / len(lines) if lines else 0
-    metrics["word_count"] = total_words
-
+    buf = np.frombuffer(article.encode("utf-8"), dtype=np.uint8)
+    values = article_metrics(buf, CODEPOINT_CLASSES, BULLET_POINTS, JAVASCRIPT)
+    metrics = dict(zip(METRIC_NAMES, values.tolist()))
+    for name in COUNT_METRICS:
+        metrics[name] = int(metrics[name])
     return metrics
 
-def process_and_save_file(file_path, save_dir):
+@numba.njit(parallel=True, cache=True, boundscheck=False)
+def compute_metrics_batch(buf, offsets, out, codepoint_classes, bullet_points, javascript):
+    """Compute metrics for article i from buf[offsets[i]:offsets[i + 1]] into out[i]."""
+    for i in numba.prange(offsets.shape[0] - 1):
+        out[i] = article_metrics(buf[offsets[i]:offsets[i + 1]], codepoint_classes, bullet_points, javascript)
+
+def compute_metrics_frame(texts):
+    """Compute quality metrics for a string array as a DataFrame, reading the Arrow UTF-8 buffer directly."""
+    if isinstance(texts, pa.ChunkedArray):
+        texts = texts.combine_chunks()
+    elif not isinstance(texts, pa.Array):
+        texts = pa.array(texts, type=pa.large_string())
+
+    # The kernel reads the offsets + data buffer layout of string/large_string; other layouts would yield zeros
+    if pa.types.is_string_view(texts.type):
+        texts = texts.cast(pa.large_string())
+    elif not (pa.types.is_string(texts.type) or pa.types.is_large_string(texts.type)):
+        raise TypeError(f"Expected a string array, got {texts.type}")
+
+    # Zero-copy views of the offsets and data buffers
+    _, offsets_buffer, data_buffer = texts.buffers()
+    offset_type = np.int64 if pa.types.is_large_string(texts.type) else np.int32
+    offsets = np.frombuffer(offsets_buffer, dtype=offset_type)[texts.offset:texts.offset + len(texts) + 1]
+    buf = np.frombuffer(data_buffer, dtype=np.uint8) if data_buffer is not None else np.zeros(0, dtype=np.uint8)
+
+    out = np.zeros((len(texts), len(METRIC_NAMES)), dtype=np.float64)
+    compute_metrics_batch(buf, offsets.astype(np.int64, copy=False), out, CODEPOINT_CLASSES, BULLET_POINTS, JAVASCRIPT)
+    return pd.DataFrame(out, columns=METRIC_NAMES).astype({name: "int64" for name in COUNT_METRICS})
+
+def quality_mask(df):
+    """Return a boolean mask of the rows meeting the quality criteria of step 05."""
+    return quality_condition(lambda name: df[name])
+
+def process_and_save_file(file_path, save_dir, apply_filter=False):
     """Process a single file and save the result with computed metrics."""
     try:
-        df = pd.read_feather(file_path)
-        metrics_list = df['text'].apply(compute_metrics).tolist()
-        metrics_df = pd.DataFrame(metrics_list)
+        table = feather.read_table(file_path)
+        metrics_df = compute_metrics_frame(table.column('text'))
+        df = table.to_pandas()
         df_with_metrics = pd.concat([df, metrics_df], axis=1)
 
+        # Drop low-quality rows here instead of re-reading the file in step 05
+        if apply_filter:
+            df_with_metrics = df_with_metrics.loc[quality_mask(df_with_metrics)].reset_index(drop=True)
+
         filename = os.path.basename(file_path)
         save_path = os.path.join(save_dir, filename)
 
         if len(df_with_metrics) > 0:
-            df_with_metrics.to_feather(save_path)
+            df_with_metrics.to_feather(save_path, compression="zstd", compression_level=3)
             logging.info(f"File saved: {save_path}")
         else:
             logging.warning(f"No data to save for file: {file_path}")
     except Exception as e:
         logging.error(f"Error processing file {file_path}: {e}")
 
-def main(input_folder, output_folder, max_processes):
+def main(input_folder, output_folder, max_processes, apply_filter=False):
     """Main function to process all files in the input folder."""
     os.makedirs(output_folder, exist_ok=True)
     files = glob(os.path.join(input_folder, "*.feather"))
@@ -89,9 +229,13 @@ def main(input_folder, output_folder, max_processes):
         return
 
     logging.info(f"Found {len(files)} files. Starting processing...")
-    process_func = partial(process_and_save_file, save_dir=output_folder)
+    process_func = partial(process_and_save_file, save_dir=output_folder, apply_filter=apply_filter)
+
+    # Each worker runs the metric kernel on its share of the cores
+    processes = min(len(files), max_processes)
+    threads = max(1, cpu_count() // processes)
 
-    with Pool(processes=min(len(files), max_processes)) as pool:
+    with Pool(processes=processes, initializer=numba.set_num_threads, initargs=(threads,)) as pool:
         for _ in tqdm(pool.imap_unordered(process_func, files), total=len(files), desc="Processing files"):
             pass
 
@@ -99,7 +243,8 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Compute quality metrics for news articles.")
     parser.add_argument("input_folder", type=str, help="Folder containing input feather files.")
     parser.add_argument("output_folder", type=str, help="Folder to save processed files.")
-    parser.add_argument("--max_processes", type=int, default=cpu_count(), help="Maximum number of processes to use.")
+    parser.add_argument("--max_processes", type=int, default=max(1, cpu_count() // 4), help="Maximum number of processes to use.")
+    parser.add_argument("--filter", action="store_true", help="Keep only articles meeting the quality criteria of step 05.")
     args = parser.parse_args()
 
-    main(args.input_folder, args.output_folder, args.max_processes)
+    main(args.input_folder, args.output_folder, args.max_processes, args.filter)
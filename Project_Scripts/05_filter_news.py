@@ -7,12 +7,16 @@ Updated for better maintainability and robustness.
 """
 import os
 import logging
-import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+from pyarrow import feather
 from glob import glob
 from functools import partial
 from multiprocessing import Pool, cpu_count
 from tqdm import tqdm
 from argparse import ArgumentParser
+from quality_criteria import quality_condition
 
 # Configure logging
 logging.basicConfig(
@@ -21,32 +25,24 @@ logging.basicConfig(
     handlers=[logging.StreamHandler()]
 )
 
+# Quality criteria an article must meet to be kept
+QUALITY_FILTER = quality_condition(pc.field)
+
 def process_and_save_file(file_path, save_dir):
     """Filter and save a single file based on quality metrics."""
     try:
-        df = pd.read_feather(file_path)
+        # Evaluate the filter in Arrow so rejected rows are never materialized
+        table = ds.dataset(file_path, format="feather").to_table(filter=QUALITY_FILTER)
+    except pa.ArrowInvalid as e:
+        logging.error(f"Missing expected column in file {file_path}: {e}")
+        return
     except Exception as e:
         logging.error(f"Error reading file {file_path}: {e}")
         return
 
-    try:
-        # Apply filtering criteria
-        df = df[
-            (df['javascript_count'] == 0) &
-            (df["sentences_count"] >= 3) &
-            (df["fraction_non_alpha_words"] < 0.1) &
-            (df['words_per_line'] > 5) &
-            (df["mean_word_length"].between(3, 12)) &
-            (df["word_count"].between(50, 10000))
-        ]
-    except KeyError as e:
-        logging.error(f"Missing expected column in file {file_path}: {e}")
-        return
-
-    if not df.empty:
-        df = df.reset_index(drop=True)
+    if table.num_rows > 0:
         save_path = os.path.join(save_dir, os.path.basename(file_path))
-        df.to_feather(save_path)
+        feather.write_feather(table, save_path, compression="zstd", compression_level=3)
         logging.info(f"File saved: {save_path}")
     else:
         logging.warning(f"No valid rows in file {file_path}. Skipping.")
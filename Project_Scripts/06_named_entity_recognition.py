@@ -10,6 +10,7 @@ import pandas as pd
 from glob import glob
 from tqdm import tqdm
 from multiprocessing import Pool, cpu_count
+from functools import partial
 import spacy
 import re
 from argparse import ArgumentParser
@@ -24,7 +25,15 @@ logging.basicConfig(
 # Pre-compiled regex for date extraction
 date_pattern = re.compile(r"\d{8}")
 
-def get_entities(filepath, nlp, out_folder):
+# spaCy model, loaded once per worker process by init_worker
+nlp = None
+
+def init_worker(model_path):
+    """Load the spaCy model in the worker process."""
+    global nlp
+    nlp = spacy.load(model_path)
+
+def get_entities(filepath, out_folder):
     """Extract named entities from a file and save results."""
     try:
         # Load data and drop rows without text
@@ -40,12 +49,12 @@ def get_entities(filepath, nlp, out_folder):
             extracted_date = match.group(0)
             data["date_crawled"] = pd.to_datetime(extracted_date)
 
-        ents_loc = []
-
-        # Process each text and extract entities
-        for text in tqdm(data["text"], desc=f"Processing {os.path.basename(filepath)}", leave=False):
-            doc = nlp(text)
-            ents_loc.append([ent.text for ent in doc.ents if ent.label_ == 'city_names'])
+        # Process texts in batches and extract entities, skipping components NER does not need
+        docs = nlp.pipe(data["text"].tolist(), batch_size=64, disable=["tagger", "parser", "lemmatizer"])
+        ents_loc = [
+            [ent.text for ent in doc.ents if ent.label_ == 'city_names']
+            for doc in tqdm(docs, total=len(data), desc=f"Processing {os.path.basename(filepath)}", leave=False)
+        ]
 
         # Add extracted entities to the DataFrame
         data["loc"] = ents_loc
@@ -57,7 +66,7 @@ def get_entities(filepath, nlp, out_folder):
 
         # Save the processed file
         out_filepath = os.path.join(out_folder, os.path.basename(filepath))
-        data.to_feather(out_filepath)
+        data.to_feather(out_filepath, compression="zstd", compression_level=3)
         logging.info(f"Saved: {out_filepath}")
 
     except Exception as e:
@@ -74,13 +83,12 @@ def main(input_folder, output_folder, model_path):
         return
 
     os.makedirs(output_folder, exist_ok=True)
-    nlp = spacy.load(model_path)
 
     logging.info(f"Starting NER processing on {len(files_to_process)} files.")
-    process_func = lambda filepath: get_entities(filepath, nlp, output_folder)
+    process_func = partial(get_entities, out_folder=output_folder)
 
     # Use multiprocessing for efficient processing
-    with Pool(processes=min(len(files_to_process), cpu_count())) as pool:
+    with Pool(processes=min(len(files_to_process), cpu_count()), initializer=init_worker, initargs=(model_path,)) as pool:
         for _ in tqdm(pool.imap_unordered(process_func, files_to_process), total=len(files_to_process), desc="Processing files"):
             pass
 
@@ -1,49 +1,65 @@
-import re
+import sqlite3
 import pandas as pd
-from tqdm import tqdm
-from multiprocessing import Pool
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
 from glob import glob
 from geopy.geocoders import Nominatim
 from geopy.extra.rate_limiter import RateLimiter
 
-# Function to read and process feather files
-def read_feather(file_path):
+# Persistent cache of geocoding results, reused across runs
+GEOCODE_CACHE_PATH = r".\geocode_cache.sqlite"
+
+# Fixed scan schema; files without any location store "loc" as list<null> and must not set the type
+LOC_SCHEMA = pa.schema([("loc", pa.list_(pa.large_string()))])
+
+def open_geocode_cache(path):
+    """
+    Opens the geocoding cache database, creating its table if needed.
+    """
+    cache = sqlite3.connect(path)
+    cache.execute("CREATE TABLE IF NOT EXISTS geocode_cache (query TEXT PRIMARY KEY, latitude REAL, longitude REAL)")
+    return cache
+
+def cached_geocode(query, geocode, cache):
     """
-    Reads a feather file and returns it as a DataFrame with additional preprocessing.
+    Returns (latitude, longitude) for a query, calling the geocoder only on a cache miss.
+    Places the geocoder could not find are cached as (None, None); errors are not cached.
     """
-    try:
-        df = pd.read_feather(file_path)
-        df["len"] = df["text"].str.split().str.len()
-        return df
-    except Exception as e:
-        print(f"Error reading {file_path}: {e}")
-        return pd.DataFrame()  # Return an empty DataFrame in case of error
+    row = cache.execute("SELECT latitude, longitude FROM geocode_cache WHERE query = ?", (query,)).fetchone()
+    if row is not None:
+        return row
+    location = geocode(query)
+    result = (location.latitude, location.longitude) if location else (None, None)
+    with cache:
+        cache.execute("INSERT OR REPLACE INTO geocode_cache VALUES (?, ?, ?)", (query, *result))
+    return result
 
 # Main function for processing feather files and creating geomap
 def main():
     # Collect all feather files from the folder with NER data
     files = glob(r".\\04_German_News_ner\\*.feather")
 
-    # Number of processes to use (adjust according to your system's capabilities)
-    num_processes = min(60, len(files))  # Ensure it does not exceed available CPUs
-
-    # Create a pool of workers for parallel processing
-    with Pool(processes=num_processes) as pool:
-        # Use tqdm to display a progress bar
-        dataframes = list(tqdm(pool.imap(read_feather, files), total=len(files)))
-
-    # Concatenate all DataFrames into one large DataFrame
-    combined_df = pd.concat(dataframes, ignore_index=True)
+    # Scan all files as one dataset, materializing only the location column (an unreadable file aborts the scan)
+    table = ds.dataset(files, format="feather", schema=LOC_SCHEMA).to_table(columns=["loc"], use_threads=True)
+    combined_df = table.to_pandas(self_destruct=True)
+    del table
 
     # Process and clean location data
     combined_df = combined_df.explode("loc").dropna(subset=["loc"])
-    combined_df["loc_normal"] = combined_df["loc"].apply(
-        lambda x: re.sub(r"[^a-zA-Zäöüß'\- ]", "", str(x).lower()).strip()
+    combined_df["loc_normal"] = (
+        combined_df["loc"].astype("string[pyarrow]").str.lower()
+        .str.replace(r"[^a-zäöüß'\- ]", "", regex=True)
+        .str.strip()
     )
     combined_df = combined_df[combined_df["loc_normal"] != ""]
 
-    # Group by normalized location and filter by occurrence count
-    geomap = combined_df.groupby("loc_normal").size().reset_index(name="count")
+    # Count occurrences per normalized location with Arrow's hash kernel and filter by count
+    counts = pc.value_counts(pa.array(combined_df["loc_normal"]))
+    geomap = pd.DataFrame({
+        "loc_normal": counts.field("values").to_pandas(),
+        "count": counts.field("counts").to_pandas()
+    })
     geomap = geomap[geomap["count"] > 100]
 
     #Initialize Geolocator
@@ -58,28 +74,26 @@ def main():
     swallow_exceptions=False
     )
 
-    # Prepare result columns
-    geomap["latitude"] = None
-    geomap["longitude"] = None
+    # Collect results in plain lists and assign the columns once
+    latitudes, longitudes = [], []
 
-    # Iterate over each place name and geocode
-    for idx, row in geomap.iterrows():
+    # Iterate over each place name and geocode, consulting the cache first
+    cache = open_geocode_cache(GEOCODE_CACHE_PATH)
+    for loc_normal in geomap["loc_normal"].tolist():
         try:
-            location = geocode(row["loc_normal"] + ", Germany")
-            if location:
-                geomap.at[idx, "latitude"] = location.latitude
-                geomap.at[idx, "longitude"] = location.longitude
-            else:
-                # mark failures however you prefer
-                geomap.at[idx, "latitude"] = None
-                geomap.at[idx, "longitude"] = None
+            latitude, longitude = cached_geocode(loc_normal + ", Germany", geocode, cache)
         except Exception as e:
-            print(f"Geocoding failed for {row['loc_normal']}: {e}")
-            geomap.at[idx, "latitude"] = None
-            geomap.at[idx, "longitude"] = None
+            print(f"Geocoding failed for {loc_normal}: {e}")
+            latitude, longitude = None, None
+        latitudes.append(latitude)
+        longitudes.append(longitude)
+    cache.close()
+
+    geomap["latitude"] = latitudes
+    geomap["longitude"] = longitudes
 
     # Now you can save or continue with your spatial join…
-    geomap.to_excel(r'.\geomap.xlsx', index=False)
+    geomap.reset_index(drop=True).to_feather(r'.\geomap.feather', compression="zstd", compression_level=3)
 
 if __name__ == "__main__":
     main()
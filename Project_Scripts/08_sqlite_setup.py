@@ -3,14 +3,25 @@ import sqlite3
 import pandas as pd
 from typing import List, Tuple, Dict
 from tqdm import tqdm
-import hashlib
+import xxhash
 import logging
 from argparse import ArgumentParser
-import re
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Bulk-load tuning: no fsync, in-memory temp storage, a 256 MiB page cache and 1 GiB of memory-mapped I/O
+BULK_LOAD_PRAGMAS = (
+    "PRAGMA synchronous=OFF;",
+    "PRAGMA temp_store=MEMORY;",
+    "PRAGMA cache_size=-262144;",
+    "PRAGMA mmap_size=1073741824;",
+    "PRAGMA locking_mode=EXCLUSIVE;",
+)
+
+# Number of metadata files inserted per transaction
+FILES_PER_COMMIT = 32
+
 # Functions
 def strip_uuid(uuid_str: str) -> str:
     """Convert UUID to a stripped format."""
@@ -25,9 +36,13 @@ def extract_tld(hostname: str) -> str:
     except Exception:
         return ""
 
+def sql_values(series: pd.Series) -> list:
+    """Convert a column to a list of Python values, with missing values as None for SQLite."""
+    return series.to_numpy(dtype=object, na_value=None).tolist()
+
 def hash_uuid(uuid_str: str) -> int:
-    """Generate a hashed integer (63-bit) from UUID using SHA-256."""
-    return int(hashlib.sha256(uuid_str.encode()).hexdigest(), 16) % (2**63 - 1)
+    """Generate a hashed integer (63-bit) from UUID using XXH3."""
+    return xxhash.xxh3_64_intdigest(uuid_str.encode()) & ((1 << 63) - 1)
 
 def create_tables(cursor):
     """Create database tables if they don't exist."""
@@ -75,11 +90,11 @@ def create_tables(cursor):
 def load_location_mapping(geomap_path: str) -> Tuple[Dict[str, int], pd.DataFrame]:
     """Load location mapping from geomap."""
     logging.info(f"Loading geomap from {geomap_path}...")
-    df = pd.read_excel(geomap_path)
+    df = pd.read_excel(geomap_path) if geomap_path.endswith(".xlsx") else pd.read_feather(geomap_path)
     required_columns = {'loc_normal', 'latitude', 'longitude', 'NUTS', 'GEN'}
     if not required_columns.issubset(df.columns):
         raise ValueError(f"The geomap file is missing required columns: {required_columns}")
-    df['location_id'] = df['loc_normal'].apply(lambda x: int(hashlib.sha1(x.encode()).hexdigest(), 16) % (10**8))
+    df['location_id'] = [xxhash.xxh64_intdigest(loc.encode()) % (10**8) for loc in df['loc_normal'].tolist()]
     location_map = dict(zip(df['loc_normal'], df['location_id']))
     return location_map, df[['location_id', 'loc_normal', 'latitude', 'longitude', 'NUTS', 'GEN']]
 
@@ -96,66 +111,73 @@ def insert_locations(df: pd.DataFrame, cursor):
 def load_and_insert_metadata(directory: str, location_map: Dict[str, int], cursor):
     """Load metadata from files and insert it into the database."""
     logging.info(f"Processing metadata files in {directory}...")
-    for filename in tqdm(os.listdir(directory)):
-        if filename.endswith('.feather'):
-            try:
-                file_path = os.path.join(directory, filename)
-                data = pd.read_feather(file_path)
-
-                # Ensure required columns exist
-                required_columns = {'id', 'url', 'excerpt', 'title', 'text', 'tags', 
-                                    'categories', 'hostname', 'date', 'date_crawled', 'loc_normal'}
-                missing_columns = required_columns - set(data.columns)
-                if missing_columns:
-                    logging.error(f"Skipping {filename}: Missing columns {missing_columns}")
-                    continue
-
-                data["id"] = data["id"].apply(strip_uuid)
-                data["tld"] = data["hostname"].apply(extract_tld)
-
-                # Ensure 'loc_normal' exists and is cleaned properly
-                data["loc_normal"] = data["loc_normal"].fillna("").astype(str).str.lower()
-                data["loc_normal"] = data["loc_normal"].apply(lambda x: re.sub(r"[^a-zäöüß ']", "", x).strip())
-
-                articles = []
-                article_locations = []
-                article_vectors = []
-                
-                for _, row in data.iterrows():
-                    articles.append((
-                        row['id'], row['url'], row['excerpt'], row['title'], 
-                        row['text'], row['tags'], row['categories'], row['hostname'], 
-                        row.get('date', None), row.get('date_crawled', None)
-                    ))
-                    
-                    location_id = location_map.get(row['loc_normal'])
-                    if location_id:
-                        article_locations.append((row['id'], location_id))
-
-                    # Generate hashed ID for each article
-                    hashed_id = hash_uuid(row['id'])
-                    article_vectors.append((row['id'], hashed_id))
-
-                # Perform batch inserts
-                cursor.executemany('''
-                    INSERT OR REPLACE INTO Articles (id, url, excerpt, title, text, tags, categories, hostname, date, date_crawled)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', articles)
-
-                cursor.executemany('''
-                    INSERT OR IGNORE INTO Article_Locations (article_id, location_id)
-                    VALUES (?, ?)
-                ''', article_locations)
-
-                cursor.executemany('''
-                    INSERT OR IGNORE INTO Article_Vectors (id, hashed_id)
-                    VALUES (?, ?)
-                ''', article_vectors)
-                
-                cursor.connection.commit()  # Commit once per file for better performance
-
-            except Exception as e:
-                logging.error(f"Error processing file {filename}: {e}", exc_info=True)
+    files = [filename for filename in os.listdir(directory) if filename.endswith('.feather')]
+    for i, filename in enumerate(tqdm(files), start=1):
+        try:
+            file_path = os.path.join(directory, filename)
+            # Arrow-backed columns keep strings as contiguous UTF-8 instead of one Python object each
+            data = pd.read_feather(file_path, dtype_backend="pyarrow")
+
+            # Ensure required columns exist
+            required_columns = {'id', 'url', 'excerpt', 'title', 'text', 'tags', 
+                                'categories', 'hostname', 'date', 'date_crawled', 'loc_normal'}
+            missing_columns = required_columns - set(data.columns)
+            if missing_columns:
+                logging.error(f"Skipping {filename}: Missing columns {missing_columns}")
+                continue
+
+            data["id"] = data["id"].apply(strip_uuid)
+            data["tld"] = data["hostname"].apply(extract_tld)
+
+            # Ensure 'loc_normal' exists and is cleaned properly
+            data["loc_normal"] = (
+                data["loc_normal"].fillna("").astype("string[pyarrow]").str.lower()
+                .str.replace(r"[^a-zäöüß ']", "", regex=True)
+                .str.strip()
+            )
+
+            # Build the insert tuples column-wise
+            ids = sql_values(data['id'])
+            articles = list(zip(
+                ids, *(sql_values(data[column]) for column in
+                       ['url', 'excerpt', 'title', 'text', 'tags', 'categories', 'hostname', 'date', 'date_crawled'])
+            ))
+
+            location_ids = data['loc_normal'].map(location_map)
+            has_location = location_ids.notna()
+            article_locations = list(zip(
+                sql_values(data.loc[has_location, 'id']),
+                location_ids[has_location].astype('int64').tolist()
+            ))
+
+            # Generate hashed ID for each article
+            article_vectors = list(zip(ids, [hash_uuid(uuid_str) for uuid_str in ids]))
+
+            # Perform batch inserts
+            cursor.executemany('''
+                INSERT OR REPLACE INTO Articles (id, url, excerpt, title, text, tags, categories, hostname, date, date_crawled)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', articles)
+
+            cursor.executemany('''
+                INSERT OR IGNORE INTO Article_Locations (article_id, location_id)
+                VALUES (?, ?)
+            ''', article_locations)
+
+            cursor.executemany('''
+                INSERT OR IGNORE INTO Article_Vectors (id, hashed_id)
+                VALUES (?, ?)
+            ''', article_vectors)
+
+        except Exception as e:
+            logging.error(f"Error processing file {filename}: {e}", exc_info=True)
+
+        finally:
+            # Commit in batches of files instead of once per file
+            if i % FILES_PER_COMMIT == 0:
+                cursor.connection.commit()
+
+    cursor.connection.commit()
 
 # Main function
 def main(text_metadata_dir, geomap_path, db_path):
@@ -164,6 +186,8 @@ def main(text_metadata_dir, geomap_path, db_path):
     cursor = connection.cursor()
     try:
         cursor.execute("PRAGMA journal_mode=WAL;")
+        for pragma in BULK_LOAD_PRAGMAS:
+            cursor.execute(pragma)
         create_tables(cursor)
         location_map, locations_df = load_location_mapping(geomap_path)
         insert_locations(locations_df, cursor)
@@ -177,7 +201,7 @@ def main(text_metadata_dir, geomap_path, db_path):
 if __name__ == "__main__":
     parser = ArgumentParser(description="Store article metadata and geolocation data into SQLite database.")
     parser.add_argument("text_metadata_dir", type=str, help="Directory containing text metadata files.")
-    parser.add_argument("geomap_path", type=str, help="Path to the geomap file.")
+    parser.add_argument("geomap_path", type=str, help="Path to the geomap Feather file (.xlsx is also accepted).")
     parser.add_argument("db_path", type=str, help="Path to the SQLite database.")
     args = parser.parse_args()
 
@@ -4,28 +4,99 @@ from sentence_transformers import SentenceTransformer
 import torch
 from sentence_transformers import quantize_embeddings
 import numpy as np
+import pyarrow as pa
+from tqdm import tqdm
+from argparse import ArgumentParser
 
-conn=sqlite3.connect(DB_PATH)
-data=pd.read_sql("SELECT id, text FROM articles",conn)
+MODEL_NAME = "mixedbread-ai/deepset-mxbai-embed-de-large-v1"
+EMBEDDING_DIM = 1024
+BATCH_SIZE = 256
+CHUNK_SIZE = 10000
 
-embedding_model=SentenceTransformer("mixedbread-ai/deepset-mxbai-embed-de-large-v1",device="cuda",model_kwargs={"torch_dtype": "float16"})
+EMBEDDINGS_PATH = "embeddings_f32.npy"
+INT8_EMBEDDINGS_PATH = "embeddings_i8.npy"
+BINARY_EMBEDDINGS_PATH = "embeddings_bin.npy"
+CALIBRATION_RANGES_PATH = "calibration_ranges.npy"
 
-embeddings=embedding_model.encode(list(data["text"]),normalize_embeddings=True,prompt="passage: ")
+ID_SCHEMA = pa.schema([("id", pa.string())])
 
-embedding_min = embeddings.min(axis=0)
-embedding_max = embeddings.max(axis=0)
-calibration_ranges = np.vstack([embedding_min, embedding_max])
+def encode_passages(embedding_model, texts, pool=None):
+    """Encode passages with large batches, through the multi-GPU pool when one is given."""
+    if pool is not None:
+        return embedding_model.encode_multi_process(
+            texts, pool, prompt="passage: ", batch_size=BATCH_SIZE, normalize_embeddings=True
+        )
 
-int8_embeddings=quantize_embeddings(embeddings, precision="int8",ranges=calibration_ranges)
+    with torch.inference_mode():
+        return embedding_model.encode(
+            texts,
+            normalize_embeddings=True,
+            prompt="passage: ",
+            batch_size=BATCH_SIZE,
+            convert_to_numpy=True
+        )
 
-binary_embeddings=quantize_embeddings(embeddings, precision="binary")
+def main(db_path, output_filepath):
+    conn = sqlite3.connect(db_path)
+    num_articles = conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
 
-data["embeddings"]=list(embeddings)
+    embedding_model = SentenceTransformer(MODEL_NAME, device="cuda", model_kwargs={"torch_dtype": "float16"})
 
-data["int8_embeddings"]=list(int8_embeddings)
+    # Spread batches over all GPUs when more than one is available
+    pool = embedding_model.start_multi_process_pool() if torch.cuda.device_count() > 1 else None
 
-data["binary_embeddings"]=list(binary_embeddings)
+    # Embeddings are written straight to disk, row i belongs to the i-th id in the output file
+    embeddings = np.lib.format.open_memmap(
+        EMBEDDINGS_PATH, mode="w+", dtype=np.float32, shape=(num_articles, EMBEDDING_DIM)
+    )
+    embedding_min = np.full(EMBEDDING_DIM, np.inf, dtype=np.float32)
+    embedding_max = np.full(EMBEDDING_DIM, -np.inf, dtype=np.float32)
 
-data.to_feather(output_filepath)
+    offset = 0
+    options = pa.ipc.IpcWriteOptions(compression=pa.Codec("zstd", compression_level=3))
+    try:
+        with pa.ipc.new_file(output_filepath, ID_SCHEMA, options=options) as writer:
+            chunks = pd.read_sql("SELECT id, text FROM articles", conn, chunksize=CHUNK_SIZE)
+            for chunk in tqdm(chunks, total=-(-num_articles // CHUNK_SIZE), desc="Encoding articles"):
+                chunk_embeddings = encode_passages(embedding_model, chunk["text"].tolist(), pool)
 
-np.save(calibration_ranges,"calibration_ranges.npy")
+                embeddings[offset:offset + len(chunk)] = chunk_embeddings
+                np.minimum(embedding_min, chunk_embeddings.min(axis=0), out=embedding_min)
+                np.maximum(embedding_max, chunk_embeddings.max(axis=0), out=embedding_max)
+
+                writer.write_table(pa.Table.from_pandas(chunk[["id"]], schema=ID_SCHEMA, preserve_index=False))
+                offset += len(chunk)
+    finally:
+        if pool is not None:
+            embedding_model.stop_multi_process_pool(pool)
+        conn.close()
+
+    embeddings.flush()
+
+    calibration_ranges = np.vstack([embedding_min, embedding_max])
+    np.save(CALIBRATION_RANGES_PATH, calibration_ranges)
+
+    # Quantize chunk by chunk straight into preallocated memmaps so only one chunk is resident
+    int8_embeddings = np.lib.format.open_memmap(
+        INT8_EMBEDDINGS_PATH, mode="w+", dtype=np.int8, shape=(num_articles, EMBEDDING_DIM)
+    )
+    binary_embeddings = np.lib.format.open_memmap(
+        BINARY_EMBEDDINGS_PATH, mode="w+", dtype=np.uint8, shape=(num_articles, EMBEDDING_DIM // 8)
+    )
+    for start in tqdm(range(0, num_articles, CHUNK_SIZE), desc="Quantizing embeddings"):
+        chunk_embeddings = embeddings[start:start + CHUNK_SIZE]
+        int8_embeddings[start:start + CHUNK_SIZE] = quantize_embeddings(
+            chunk_embeddings, precision="int8", ranges=calibration_ranges
+        )
+        binary_embeddings[start:start + CHUNK_SIZE] = quantize_embeddings(chunk_embeddings, precision="ubinary")
+
+    int8_embeddings.flush()
+    binary_embeddings.flush()
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Transform article texts into quantized sentence embeddings.")
+    parser.add_argument("db_path", type=str, help="Path to the SQLite database.")
+    parser.add_argument("output_filepath", type=str, help="Path to save the article ids feather file.")
+    args = parser.parse_args()
+
+    main(args.db_path, args.output_filepath)
@@ -1,30 +1,56 @@
 from usearch.index import Index
 import pandas as pd
 import numpy as np
-from glob import glob
-from tqdm import tqdm
-import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+import xxhash
+from argparse import ArgumentParser
+
+EMBEDDINGS_PATH = "embeddings_f32.npy"
+INT8_EMBEDDINGS_PATH = "embeddings_i8.npy"
+BINARY_EMBEDDINGS_PATH = "embeddings_bin.npy"
 
 def hash_uuid(uuid_str: str) -> int:
-    """Generate a hashed integer (63-bit) from UUID using SHA-256."""
-    return int(hashlib.sha256(uuid_str.encode()).hexdigest(), 16) % (2**63 - 1)
-  
-data=pd.read_feather(PATH_TO_DATA)
-data["hashed_id"]=data["id"].apply(hash_uuid)
-index = Index(ndim=1024, metric="cos", dtype="f32")
-embeddings=np.array(list(data["embeddings"]))
-index.add(list(df["hashed_id"]), embeddings)
-index.save(".\NewsIndex_f32.usearch")
-
-index = Index(ndim=128, metric="Hamming", dtype="i8")
-binary_embeddings=np.array(list(data["binary_embeddings"]))
-# Add quantized embeddings and hashed IDs to the Usearch index
-index.add(list(df["hashed_id"]), binary_embeddings)
-index.save(".\NewsIndex_binary.usearch")
-
-
-index = Index(ndim=1024, metric="ip", dtype="i8")
-int8_embeddings=np.array(list(data["int8_embeddings"]))
-# Add quantized embeddings and hashed IDs to the Usearch index
-index.add(list(df["hashed_id"]), int8_embeddings)
-index.save(".\NewsIndex_int8.usearch")
+    """Generate a hashed integer (63-bit) from UUID using XXH3."""
+    return xxhash.xxh3_64_intdigest(uuid_str.encode()) & ((1 << 63) - 1)
+
+def build_index(index_kwargs, keys, vectors, index_path, threads):
+    """Add the hashed IDs and their vectors to a new Usearch index and save it."""
+    index = Index(connectivity=16, **index_kwargs)
+    index.add(keys, vectors, threads=threads)
+    index.save(index_path)
+
+def main(ids_path):
+    ids = pd.read_feather(ids_path, columns=["id"])["id"].tolist()
+
+    # Hash every id once into a typed key array shared by all indexes; keys and the
+    # memory-mapped .npy vectors are handed to usearch without a Python round-trip or copy
+    keys = np.fromiter((hash_uuid(uuid_str) for uuid_str in ids), dtype=np.uint64, count=len(ids))
+
+    embeddings = np.ascontiguousarray(np.load(EMBEDDINGS_PATH, mmap_mode="r"), dtype=np.float32)
+    # 1024 sign bits per article, packed into 128 uint8 bytes
+    binary_embeddings = np.ascontiguousarray(np.load(BINARY_EMBEDDINGS_PATH, mmap_mode="r"), dtype=np.uint8)
+    int8_embeddings = np.ascontiguousarray(np.load(INT8_EMBEDDINGS_PATH, mmap_mode="r"), dtype=np.int8)
+
+    builds = [
+        (dict(ndim=1024, metric="cos", dtype="f32"), embeddings, r".\NewsIndex_f32.usearch"),
+        (dict(ndim=1024, metric="hamming", dtype="b1"), binary_embeddings, r".\NewsIndex_binary.usearch"),
+        (dict(ndim=1024, metric="ip", dtype="i8"), int8_embeddings, r".\NewsIndex_int8.usearch"),
+    ]
+
+    # The indexes are independent and usearch releases the GIL in add(), so build them side by side
+    threads = max(1, (os.cpu_count() or 1) // len(builds))
+    with ThreadPoolExecutor(max_workers=len(builds)) as executor:
+        futures = [
+            executor.submit(build_index, index_kwargs, keys, vectors, index_path, threads)
+            for index_kwargs, vectors, index_path in builds
+        ]
+        for future in futures:
+            future.result()
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Build Usearch vector indexes from the article embeddings.")
+    parser.add_argument("ids_path", type=str, help="Path to the article ids feather file written by step 09.")
+    args = parser.parse_args()
+
+    main(args.ids_path)
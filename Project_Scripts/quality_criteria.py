@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+"""
+Quality criteria shared by the metric computation (step 04) and the news filter (step 05).
+"""
+import operator
+from functools import reduce
+
+# (metric, comparison, threshold) an article must satisfy to be kept
+QUALITY_CRITERIA = (
+    ("javascript_count", operator.eq, 0),
+    ("sentences_count", operator.ge, 3),
+    ("fraction_non_alpha_words", operator.lt, 0.1),
+    ("words_per_line", operator.gt, 5),
+    ("mean_word_length", operator.ge, 3),
+    ("mean_word_length", operator.le, 12),
+    ("word_count", operator.ge, 50),
+    ("word_count", operator.le, 10000),
+)
+
+def quality_condition(column):
+    """Combine all criteria into one condition, where column(name) returns a pandas Series or an Arrow field."""
+    return reduce(operator.and_, (compare(column(name), threshold) for name, compare, threshold in QUALITY_CRITERIA))